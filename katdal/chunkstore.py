@@ -158,6 +158,16 @@ def _scalar_to_chunk(func):
     return func_returning_chunk
 
 
+@functools.lru_cache(maxsize=256)
+def _npy_header(shape, dtype):
+    """Version 1.0 `.npy` header of C-ordered array (cached as arrays share it)."""
+    fp = io.BytesIO()
+    header_fields = {'descr': np.lib.format.dtype_to_descr(dtype),
+                     'fortran_order': False, 'shape': shape}
+    np.lib.format.write_array_header_1_0(fp, header_fields)
+    return fp.getvalue()
+
+
 def npy_header_and_body(chunk):
     """Prepare a chunk for low-level writing.
 
@@ -172,12 +182,8 @@ def npy_header_and_body(chunk):
     # Note: don't use ascontiguousarray as it turns 0D into 1D.
     # See https://github.com/numpy/numpy/issues/5300
     chunk = np.asarray(chunk, order='C')
-    fp = io.BytesIO()
     # TODO: have a fallback to version 2.0 if the header is too big for 1.0
-    header_fields = np.lib.format.header_data_from_array_1_0(chunk)
-    np.lib.format.write_array_header_1_0(fp, header_fields)
-    header = fp.getvalue()
-    return header, chunk
+    return _npy_header(chunk.shape, chunk.dtype), chunk
 
 
 class ChunkStore:
@@ -251,6 +257,43 @@ class ChunkStore:
         """
         raise NotImplementedError
 
+    def get_chunk_into(self, array_name, slices, out):
+        """Get chunk from the store and store it in an existing array.
+
+        This lets the caller reuse or preallocate the memory of the chunk,
+        e.g. as part of a larger array. Stores that can read the chunk
+        directly into `out` do so, while the default implementation copies
+        the result of :meth:`get_chunk` into it.
+
+        Parameters
+        ----------
+        array_name : string
+            Identifier of parent array `x` of chunk
+        slices : sequence of unit-stride slice objects
+            Identifier of individual chunk, to be extracted as `x[slices]`
+        out : :class:`numpy.ndarray` object
+            Writable destination array with the dtype of `x` and shape dictated
+            by `slices`
+
+        Returns
+        -------
+        out : :class:`numpy.ndarray` object
+            The `out` array, now containing the chunk
+
+        Raises
+        ------
+        :exc:`chunkstore.BadChunk`
+            If `out` does not match the shape dictated by `slices` or the
+            underlying parent array dtype, or `slices` has wrong specification
+        :exc:`chunkstore.StoreUnavailable`
+            If interaction with chunk store failed (offline, bad auth, bad config)
+        :exc:`chunkstore.ChunkNotFound`
+            If requested chunk was not found in store
+        """
+        self.chunk_metadata(array_name, slices, chunk=out)
+        out[...] = self.get_chunk(array_name, slices, out.dtype)
+        return out
+
     def get_chunk_or_default(self, array_name, slices, dtype, default_value=0):
         """Get chunk from the store but return default value if it is missing."""
         try:
@@ -337,6 +380,61 @@ class ChunkStore:
         """Check whether :meth:`mark_complete` has been called for this array."""
         raise NotImplementedError
 
+    def list_chunk_ids(self, array_name):
+        """List the IDs of all chunks of an array that are present in the store.
+
+        Parameters
+        ----------
+        array_name : string
+            Identifier of array
+
+        Returns
+        -------
+        chunk_ids : list of string
+            Chunk identifiers in string form (see :meth:`chunk_id_str`),
+            in no particular order (empty if the array does not exist)
+
+        Raises
+        ------
+        :exc:`chunkstore.StoreUnavailable`
+            If interaction with chunk store failed (offline, bad auth, bad config)
+        """
+        raise NotImplementedError
+
+    def has_chunks(self, array_name, slices_list):
+        """Check which of a sequence of chunks are present in the store.
+
+        This lists the array once via :meth:`list_chunk_ids` instead of
+        probing each chunk individually, which is much cheaper when checking
+        many chunks of the same array.
+
+        Parameters
+        ----------
+        array_name : string
+            Identifier of parent array `x` of chunks
+        slices_list : sequence of sequences of unit-stride slice objects
+            Identifiers of individual chunks, each to be extracted as `x[slices]`
+
+        Returns
+        -------
+        present : list of bool
+            True for each chunk in `slices_list` that is in the store
+            (all False if the array does not exist)
+
+        Raises
+        ------
+        :exc:`chunkstore.BadChunk`
+            If any `slices` has wrong specification
+        :exc:`chunkstore.StoreUnavailable`
+            If interaction with chunk store failed (offline, bad auth, bad config)
+        NotImplementedError
+            If the store does not support :meth:`list_chunk_ids`
+        """
+        chunk_ids = [self.split(self.chunk_metadata(array_name, slices)[0])[-1]
+                     for slices in slices_list]
+        existing = set(self.list_chunk_ids(array_name))
+        return [chunk_id in existing for chunk_id in chunk_ids]
+
     NAME_SEP = '/'
     # Width sufficient to store any dump / channel / corrprod index for MeerKAT
     NAME_INDEX_WIDTH = 5
@@ -354,8 +452,8 @@ class ChunkStore:
     @classmethod
     def chunk_id_str(cls, slices):
         """Chunk identifier in string form (e.g. '00012_01024_00000')."""
-        return '_'.join("{:0{w}d}".format(s.start, w=cls.NAME_INDEX_WIDTH)
-                        for s in slices)
+        # This is on the hot path of every chunk access, hence str.zfill
+        return '_'.join([str(s.start).zfill(cls.NAME_INDEX_WIDTH) for s in slices])
 
     @classmethod
     def chunk_metadata(cls, array_name, slices, chunk=None, dtype=None):
@@ -397,7 +495,7 @@ class ChunkStore:
             raise BadChunk(f'Array {array_name!r}: chunk ID should be '
                            f'a sequence of slice objects, not {slices}')
         # Verify that all slice strides are unity (i.e. it's a "simple" slice)
-        if not all([s.step in (1, None) for s in slices]):
+        if not all(s.step in (1, None) for s in slices):
             raise BadChunk(f'Array {array_name!r}: chunk ID {slices} contains non-unit strides')
         # Construct chunk name from array_name + slices
         chunk_name = cls.join(array_name, cls.chunk_id_str(slices))
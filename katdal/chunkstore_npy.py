@@ -133,7 +133,21 @@ class NpyFileChunkStore(ChunkStore):
         touch_file = os.path.join(self.path, array_name, 'complete')
         return os.path.isfile(touch_file)
 
+    def list_chunk_ids(self, array_name):
+        """See the docstring of :meth:`ChunkStore.list_chunk_ids`."""
+        array_dir = os.path.join(self.path, array_name)
+        with self._standard_errors():
+            try:
+                filenames = os.listdir(array_dir)
+            except FileNotFoundError:
+                # The array has not been created (yet), so it has no chunks
+                return []
+        # Skip chunks that are still being written by put_chunk
+        return [name[:-4] for name in filenames
+                if name.endswith('.npy') and not name.endswith('.writing.npy')]
+
     get_chunk.__doc__ = ChunkStore.get_chunk.__doc__
     put_chunk.__doc__ = ChunkStore.put_chunk.__doc__
     mark_complete.__doc__ = ChunkStore.mark_complete.__doc__
     is_complete.__doc__ = ChunkStore.is_complete.__doc__
+    list_chunk_ids.__doc__ = ChunkStore.list_chunk_ids.__doc__
@@ -17,27 +17,51 @@
 """A store of chunks (i.e. N-dimensional arrays) based on the Amazon S3 API."""
 
 import contextlib
+import collections
+import concurrent.futures
+import functools
+import io
 import threading
 import urllib.parse
 import urllib.request
 import urllib.error
 import hashlib
+import hmac
 import base64
 import copy
 import json
+import socket
 import time
+import re
+import weakref
+try:
+    from math import prod
+except ImportError:
+    # math.prod was only added in Python 3.8
+    def prod(iterable):
+        result = 1
+        for item in iterable:
+            result *= item
+        return result
 
 import numpy as np
 import requests
 import jwt
+import defusedxml.ElementTree
 try:
     import botocore.credentials
     import botocore.auth
+    import botocore.compat
 except ImportError:
     botocore = None
+try:
+    import crc32c
+except ImportError:
+    crc32c = None
 from urllib3.util.retry import Retry
+from urllib3.connection import HTTPConnection
 from urllib3.response import HTTPResponse
-from urllib3.exceptions import MaxRetryError
+from urllib3.exceptions import MaxRetryError, ProtocolError, ReadTimeoutError
 
 from .chunkstore import (ChunkStore, StoreUnavailable, ChunkNotFound, BadChunk,
                          npy_header_and_body)
@@ -73,6 +97,12 @@ _TRUNCATED_HTTP_STATUS_CODE = 555
 # These HTTP responses typically indicate temporary S3 server / proxy overload,
 # which will trigger retries terminating in a missing data response if unsuccessful.
 _DEFAULT_SERVER_GLITCHES = (500, 502, 503, 504, _TRUNCATED_HTTP_STATUS_CODE)
+# Upper limit on concurrent requests made by get_chunks / put_chunks by default
+_DEFAULT_MAX_WORKERS = 32
+# XML namespace of S3 API responses
+_S3_NS = '{http://s3.amazonaws.com/doc/2006-03-01/}'
+# Chunk names made up of these characters only need no URL quoting
+_URL_SAFE_NAME = re.compile(r'[A-Za-z0-9_/.\-]+').fullmatch
 
 
 class S3ObjectNotFound(ChunkNotFound):
@@ -110,7 +140,32 @@ class _DetectTruncation:
         return data
 
 
-def read_array(fp):
+# Version 1.0 NPY header as written by NumPy for arrays with a simple dtype
+_NPY_HEADER_1_0 = re.compile(
+    rb"\{'descr': '([^']+)', 'fortran_order': (False|True), 'shape': \(((?:\d+, ?)*\d*)\), \} *\n")
+
+
+def _read_npy_header_1_0(fp):
+    """Faster version of :func:`numpy.lib.format.read_array_header_1_0`.
+
+    This parses the standard headers written by NumPy with a regular
+    expression instead of evaluating the header dict, and only falls back to
+    the NumPy function for anything else (e.g. structured dtypes).
+    """
+    header_len_bytes = fp.read(2)
+    header_len = int.from_bytes(header_len_bytes, 'little')
+    header = fp.read(header_len)
+    if len(header_len_bytes) < 2 or len(header) < header_len:
+        raise TruncatedRead('Error reading from S3 HTTP response: NPY header is incomplete')
+    match = _NPY_HEADER_1_0.fullmatch(header)
+    if not match:
+        return np.lib.format.read_array_header_1_0(io.BytesIO(header_len_bytes + header))
+    descr, fortran_order, shape = match.groups()
+    shape = tuple(int(dim) for dim in shape.split(b',') if dim.strip())
+    return shape, fortran_order == b'True', np.dtype(descr.decode())
+
+
+def read_array(fp, out=None):
     """Read a numpy array in npy format from a file descriptor.
 
     This is the same concept as :func:`numpy.lib.format.read_array`, but
@@ -119,6 +174,11 @@ def read_array(fp):
     array, while this implementation uses `readinto`. Raise :class:`TruncatedRead`
     if the response runs out of data before the array is complete.
 
+    If an existing array `out` is provided, the data is stored in it and `out`
+    is returned instead. The stored array needs to match it in shape and dtype,
+    otherwise :class:`~katdal.chunkstore.BadChunk` is raised. The data is read
+    straight into `out` if it has the same memory layout as the stored array.
+
     It does not allow pickled dtypes.
     """
     # Wrap file object in _DetectTruncation since data can run out while
@@ -126,15 +186,25 @@ def read_array(fp):
     fp = _DetectTruncation(fp)
     version = np.lib.format.read_magic(fp)
     if version == (1, 0):
-        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fp)
+        shape, fortran_order, dtype = _read_npy_header_1_0(fp)
     elif version == (2, 0):
         shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(fp)
     else:
         raise ValueError(f'Unsupported .npy version {version}')
     if dtype.hasobject:
         raise ValueError('Object arrays are not supported')
-    count = int(np.product(shape))
-    data = np.ndarray(count, dtype=dtype)
+    # Avoid np.product as it turns the shape tuple into an array first
+    count = prod(shape)
+    direct = None
+    if out is not None:
+        if out.shape != shape or out.dtype != dtype:
+            raise BadChunk(f'dtype {dtype} and/or shape {shape} in store differs from '
+                           f'expected dtype {out.dtype} and shape {out.shape}')
+        # Fortran-ordered data is stored as the C-ordered transpose
+        layout = out.T if fortran_order else out
+        if layout.flags.c_contiguous and layout.flags.writeable:
+            direct = layout.reshape(-1)
+    data = direct if direct is not None else np.ndarray(count, dtype=dtype)
     # For HTTPResponse it works to just pass in `data` directly, but the
     # wrapping is added for the benefit of any other implementation that
     # isn't expecting a numpy array
@@ -147,10 +217,115 @@ def read_array(fp):
         data = data.transpose()
     else:
         data.shape = shape
-    return data
+    if out is None:
+        return data
+    if direct is None:
+        out[...] = data
+    return out
+
 
+def _parse_bucket_listing(response, prefix):
+    """Extract chunk IDs from a ListObjectsV2 response while it is being received.
 
-def _read_chunk(response):
+    The XML is parsed incrementally and each element is discarded as soon as
+    it has been processed, instead of building a tree of the entire response
+    (which may list a hundred thousand keys).
+
+    Parameters
+    ----------
+    response : :class:`requests.Response`
+        Streamed response to bucket listing request
+    prefix : str
+        Prefix shared by all keys in listing (stripped from chunk IDs)
+
+    Returns
+    -------
+    chunk_ids : list of str
+        IDs of chunks (i.e. keys of NPY objects without prefix and extension)
+    next_page : dict or None
+        Query parameters that continue the listing if it is truncated, else None
+
+    Raises
+    ------
+    :exc:`chunkstore.StoreUnavailable`
+        If the listing is truncated but offers no way to continue it
+    """
+    # Let urllib3 undo any content encoding (e.g. gzip) while we stream
+    response.raw.decode_content = True
+    chunk_ids = []
+    # Bind these to locals as the loop runs once per element of a big listing
+    add_chunk_id = chunk_ids.append
+    key_tag, contents_tag = _S3_NS + 'Key', _S3_NS + 'Contents'
+    truncated_tag, marker_tag = _S3_NS + 'IsTruncated', _S3_NS + 'NextMarker'
+    token_tag = _S3_NS + 'NextContinuationToken'
+    prefix_len = len(prefix)
+    last_key = None
+    truncated = False
+    next_token = next_marker = None
+    try:
+        for _, elem in defusedxml.ElementTree.iterparse(response.raw):
+            tag = elem.tag
+            if tag == key_tag:
+                last_key = elem.text
+                if last_key.endswith('.npy'):
+                    add_chunk_id(last_key[prefix_len:-4])
+            elif tag == contents_tag:
+                # Drop the processed key and its metadata; the emptied element
+                # stays in the tree, but max-keys bounds the number of those
+                elem.clear()
+            elif tag == truncated_tag:
+                truncated = (elem.text == 'true')
+            elif tag == token_tag:
+                next_token = elem.text
+            elif tag == marker_tag:
+                next_marker = elem.text
+    except (defusedxml.ElementTree.ParseError, ProtocolError, ReadTimeoutError) as err:
+        # The response was most likely cut short (the XML itself comes from S3)
+        raise TruncatedRead(f'Error reading bucket listing from S3 HTTP response: {err}') from err
+    if not truncated:
+        return chunk_ids, None
+    if next_token is not None:
+        return chunk_ids, {'continuation-token': next_token}
+    # No token implies a V1-only server that ignored list-type=2 (or a sloppy
+    # V2 one), so continue after the last key in both dialects of the API
+    start_after = next_marker or last_key
+    if start_after is None:
+        raise StoreUnavailable('Truncated bucket listing from S3 has no continuation token or keys')
+    return chunk_ids, {'start-after': start_after, 'marker': start_after}
+
+
+def _md5(data=b''):
+    """MD5 hash object for integrity checks (not security, hence FIPS-friendly)."""
+    try:
+        return hashlib.md5(data, usedforsecurity=False)
+    except TypeError:
+        # The usedforsecurity parameter only exists on Python >= 3.9
+        return hashlib.md5(data)
+
+
+class _Crc32c:
+    """CRC32C checksum with the hashlib interface (needs the crc32c package)."""
+
+    def __init__(self):
+        self._value = 0
+
+    def update(self, data):
+        self._value = crc32c.crc32c(data, self._value)
+
+    def digest(self):
+        return self._value.to_bytes(4, 'big')
+
+
+# Request header and hash object factory for each supported upload checksum.
+# All but MD5 use the "additional checksums" of the S3 API.
+_CHECKSUMS = {
+    'md5': ('Content-MD5', _md5),
+    'sha256': ('x-amz-checksum-sha256', hashlib.sha256),
+    'crc32c': ('x-amz-checksum-crc32c', _Crc32c),
+}
+
+
+def _read_chunk(response, out=None):
     """Efficiently read NumPy array in NPY format from content of HTTP response."""
     data = response.raw
     # Workaround for https://github.com/urllib3/urllib3/issues/1540
@@ -159,12 +334,17 @@ def _read_chunk(response):
     if ('Content-encoding' not in response.headers
             and hasattr(data, '_fp')
             and hasattr(data._fp, 'readinto')):
-        chunk = read_array(data._fp)
+        chunk = read_array(data._fp, out)
     else:
-        chunk = read_array(data)
-    # This shouldn't actually read any data, but will make requests aware that
-    # we've consumed all the data and hence it can reuse the connection.
-    response.content
+        chunk = read_array(data, out)
+    if getattr(data, '_fp', None) is not None and data._fp.isclosed():
+        # The body has been read in full, so hand the connection straight
+        # back to the pool for reuse
+        data.release_conn()
+    else:
+        # Make requests drain any remaining data instead, which also makes
+        # it aware that it can reuse the connection
+        response.content
     return chunk
 
 
@@ -259,16 +439,20 @@ class _BearerAuth(requests.auth.AuthBase):
         if 'prefix' not in self._claims:
             raise InvalidToken(token, "Token has no 'prefix' claim")
         self._token = token
+        # This is called for every request, so prepare what we can up front
+        self._prefixes = tuple(self._claims['prefix'])
+        self._header = f'Bearer {token}'
 
     def __call__(self, r):
-        # Check if token authorises URL even before hitting server for better reporting
-        path = urllib.parse.urlparse(r.url).path.lstrip('/')
-        valid_prefixes = self._claims['prefix']
-        if not any(path.startswith(prefix) for prefix in valid_prefixes):
-            allowed = ', '.join(f"'{prefix}*'" for prefix in valid_prefixes)
+        # Check if token authorises URL even before hitting server for better reporting.
+        # Requests always hands us a full URL (scheme://netloc/path?query), which
+        # lets us avoid a costly urlparse on each request.
+        path = r.url.partition('://')[2].partition('/')[2].partition('?')[0].lstrip('/')
+        if not path.startswith(self._prefixes):
+            allowed = ', '.join(f"'{prefix}*'" for prefix in self._prefixes)
             raise InvalidToken(self._token,
                                f"Token does not grant access to '{path}', only to {allowed}")
-        r.headers['Authorization'] = f'Bearer {self._token}'
+        r.headers['Authorization'] = self._header
         return r
 
 
@@ -281,11 +465,23 @@ class _AWSAuth(requests.auth.AuthBase):
         credentials = botocore.credentials.ReadOnlyCredentials(
             credentials[0], credentials[1], None)
         self._signer = botocore.auth.HmacV1Auth(credentials)
+        # Key the HMAC once and copy it for each request instead of starting over
+        self._hmac = hmac.new(credentials.secret_key.encode('utf-8'), digestmod=hashlib.sha1)
 
     def __call__(self, r):
         access_key = self._signer.credentials.access_key
         split = urllib.parse.urlsplit(r.url)
-        signature = self._signer.get_signature(r.method, split, r.headers)
+        # The signer expects botocore's headers, which support multiple
+        # values per header (needed to sign any x-amz-* headers)
+        headers = botocore.compat.HTTPHeaders()
+        for key, value in r.headers.items():
+            headers[key] = value
+        string_to_sign = self._signer.canonical_string(r.method, split, headers)
+        signer = self._hmac.copy()
+        signer.update(string_to_sign.encode('utf-8'))
+        signature = base64.b64encode(signer.digest()).decode()
+        # The signer also adds a Date header that forms part of the signature
+        r.headers['Date'] = headers['Date']
         r.headers['Authorization'] = f'AWS {access_key}:{signature}'
         return r
 
@@ -307,57 +503,92 @@ def _auth_factory(url, token=None, credentials=None):
 
 
 class _CacheSettingsSession(requests.Session):
-    """Session that caches the result of proxy lookup.
+    """Session that only looks up environment settings once.
 
     Normally requests spends a lot of time per request just to figure out what
     proxy server to use if any. For our usage, all URLs will be going to the
     same host and hence should always have the same proxy config, so we look
-    it up once on the root URL for the chunk store and save the result.
+    it up once on the root URL for the chunk store, store the result as the
+    session's own settings and stop requests from consulting the environment.
+    This includes proxies, CA bundle and .netrc credentials.
 
     This has some limitations:
-    - Proxy settings can't be changed.
-    - Session settings (e.g. certificate-related) must not be changed after the
-      first request.
+    - Changes to the environment after construction are ignored.
     - All requests should be to the same host.
     - It is not thread-safe.
     """
 
     def __init__(self, url):
         super().__init__()
-        self._cached_settings = super().merge_environment_settings(url, {}, True, None, None)
+        settings = super().merge_environment_settings(url, {}, True, None, None)
+        self.proxies = settings['proxies']
+        self.verify = settings['verify']
+        self.cert = settings['cert']
+        self.auth = requests.utils.get_netrc_auth(url)
+        self.trust_env = False
+
+
+def _keepalive_socket_options(idle=60, interval=10, count=6):
+    """Socket options that enable TCP keepalive with the given timers (in seconds).
+
+    The OS default idle time before the first probe is typically two hours,
+    far longer than the idle timeouts of firewalls and NAT gateways (often a
+    few minutes), so shorten it where the platform allows. A dead connection
+    is detected after about `idle` + `interval` * `count` seconds.
+    """
+    options = [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+    # TCP_KEEPIDLE is called TCP_KEEPALIVE on macOS
+    idle_option = getattr(socket, 'TCP_KEEPIDLE', getattr(socket, 'TCP_KEEPALIVE', None))
+    if idle_option is not None:
+        options.append((socket.IPPROTO_TCP, idle_option, idle))
+    if hasattr(socket, 'TCP_KEEPINTVL'):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, interval))
+    if hasattr(socket, 'TCP_KEEPCNT'):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPCNT, count))
+    return options
+
+
+class _KeepAliveHTTPAdapter(requests.adapters.HTTPAdapter):
+    """HTTP adapter that enables TCP keepalive on its connections.
+
+    Sessions and their connections live as long as the chunk store and may
+    sit idle for a long time between bursts of requests. Keepalive probes
+    sent after a minute of inactivity prevent firewalls and NAT gateways from
+    silently dropping these idle connections, which would otherwise only be
+    discovered (and retried) on the next request. The default urllib3 socket
+    options, which include TCP_NODELAY, are retained.
+    """
+
+    socket_options = HTTPConnection.default_socket_options + _keepalive_socket_options()
 
-    def merge_environment_settings(self, url, proxies, stream, verify, cert):
-        # Only cache for a specific combination of input settings (the
-        # combination used by get_chunk), rather than trying to cache all
-        # variants.
-        if (proxies, stream, verify, cert) == ({}, True, None, None):
-            if self._cached_settings is None:
-                self._cached_settings = super().merge_environment_settings(
-                    url, proxies, stream, verify, cert)
-            return self._cached_settings
-        else:
-            return super().merge_environment_settings(url, proxies, stream, verify, cert)
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs.setdefault('socket_options', self.socket_options)
+        super().init_poolmanager(*args, **kwargs)
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        proxy_kwargs.setdefault('socket_options', self.socket_options)
+        return super().proxy_manager_for(proxy, **proxy_kwargs)
 
 
 class _Pool:
     """Thread-safe pool of objects constructed by a factory as needed."""
     def __init__(self, factory):
         self._factory = factory
-        self._pool = []
-        self._lock = threading.Lock()
+        # Deque appends and pops are atomic, so this needs no lock
+        self._pool = collections.deque()
 
     def get(self):
         """Obtain an item from the pool, creating a new one if the pool is empty."""
-        with self._lock:
-            if not self._pool:
-                return self._factory()
-            else:
-                return self._pool.pop()
+        try:
+            # Reuse the most recently returned item, which is most likely to
+            # still have live connections
+            return self._pool.pop()
+        except IndexError:
+            return self._factory()
 
     def put(self, item):
         """Return an item to the pool"""
-        with self._lock:
-            self._pool.append(item)
+        self._pool.append(item)
 
     @contextlib.contextmanager
     def __call__(self):
@@ -367,6 +598,27 @@ class _Pool:
         self.put(item)
 
 
+# Session pools shared by S3ChunkStores with the same URL, auth and retry settings,
+# which lets a new store reuse the warm connections of an existing one
+_SESSION_POOLS = weakref.WeakValueDictionary()
+_SESSION_POOLS_LOCK = threading.Lock()
+
+
+def _shared_pool(key, factory):
+    """Get the pool registered under `key`, creating it with `factory` if needed.
+
+    A `key` of None disables sharing and always returns a new pool. Pools are
+    only kept alive by the stores that use them.
+    """
+    if key is None:
+        return _Pool(factory)
+    with _SESSION_POOLS_LOCK:
+        pool = _SESSION_POOLS.get(key)
+        if pool is None:
+            pool = _SESSION_POOLS[key] = _Pool(factory)
+        return pool
+
+
 class _Multipart:
     """Allow a sequence of bytes-like objects to be used as a request body.
 
@@ -386,6 +638,17 @@ class _Multipart:
         """Total content length (retrieved by requests to set Content-Length)"""
         return sum(memoryview(item).nbytes for item in self.items)
 
+    def digest(self, hash_factory):
+        """Digest of the concatenated items, hashed in place.
+
+        The `hash_factory` creates an object with the interface of the
+        :mod:`hashlib` hash objects, e.g. :func:`hashlib.sha256`.
+        """
+        hash_gen = hash_factory()
+        for item in self.items:
+            hash_gen.update(item)
+        return hash_gen.digest()
+
 
 class S3ChunkStore(ChunkStore):
     """A store of chunks (i.e. N-dimensional arrays) based on the Amazon S3 API.
@@ -429,6 +692,13 @@ class S3ChunkStore(ChunkStore):
     expiry_days : int, optional
         If set to a value greater than 0 will set a future expiry time in days
         for any new buckets created.
+    checksum : {'md5', 'sha256', 'crc32c', None}, optional
+        Checksum sent along with each uploaded chunk, which the server uses to
+        detect corruption in transmission. The default is a Content-MD5 header,
+        while 'sha256' and 'crc32c' use the newer S3 additional checksums (not
+        supported by all servers). CRC32C is much faster to compute and needs
+        the crc32c package. Set to None to skip the pass over the data to hash
+        it (only for trusted networks).
     kwargs : dict
         Extra keyword arguments (unused)
 
@@ -438,16 +708,24 @@ class S3ChunkStore(ChunkStore):
         If S3 server interaction failed (it's down, no authentication, etc)
     """
 
+    # Maximum number of keys per bucket listing request (the S3 default is 1000)
+    list_max_keys = 100000
+
     def __init__(self, url, timeout=(30, 300), retries=2, token=None,
-                 credentials=None, public_read=False, expiry_days=0, **kwargs):
+                 credentials=None, public_read=False, expiry_days=0,
+                 checksum='md5', **kwargs):
         error_map = {requests.exceptions.RequestException: StoreUnavailable}
         super().__init__(error_map)
         auth = _auth_factory(url, token, credentials)
+        # Custom Retry objects can't be compared, so don't share those sessions
+        pool_key = None
         if not isinstance(retries, Retry):
             try:
                 connect_retries, read_retries = retries
             except TypeError:
                 connect_retries = read_retries = retries
+            pool_key = (to_str(url), token, credentials and tuple(credentials),
+                        connect_retries, read_retries)
             # The backoff factor of 10 provides 5 minutes worth of retries
             # when the S3 server is strained; with 5 retries you get
             # (0 + 2 + 4 + 8 + 16) * 10 = 300 seconds on top of read timeouts.
@@ -457,23 +735,36 @@ class S3ChunkStore(ChunkStore):
 
         def session_factory():
             session = _CacheSettingsSession(url)
-            session.auth = auth
+            # Explicit auth overrides any .netrc credentials found by the session
+            if auth is not None:
+                session.auth = auth
             # Don't let requests do status retries as we'll be doing it ourselves
             max_retries = retries.new(status=0, raise_on_status=False)
-            adapter = requests.adapters.HTTPAdapter(max_retries=max_retries)
+            adapter = _KeepAliveHTTPAdapter(max_retries=max_retries)
             session.mount(url, adapter)
             return session
 
-        self._session_pool = _Pool(session_factory)
+        self._session_pool = _shared_pool(pool_key, session_factory)
         self._url = to_str(url)
+        # Chunk names are relative to the store URL, as per urllib.parse.urljoin,
+        # but form the URL prefix once instead of parsing the URL on every request
+        self._url_prefix = urllib.parse.urljoin(self._url, '.')
         self._retries = retries
         self.timeout = timeout
         self.public_read = public_read
         self.expiry_days = int(expiry_days)
+        if checksum is not None and checksum not in _CHECKSUMS:
+            raise ValueError(f'Unknown checksum {checksum!r}, expected one of {sorted(_CHECKSUMS)}')
+        if checksum == 'crc32c' and not crc32c:
+            raise StoreUnavailable('The crc32c checksum requires the crc32c package to be installed')
+        self.checksum = checksum
 
     def _chunk_url(self, chunk_name, extension='.npy'):
         """Assemble URL corresponding to chunk (or array) name."""
-        return urllib.parse.urljoin(self._url, to_str(urllib.parse.quote(chunk_name + extension)))
+        name = chunk_name + extension
+        if not _URL_SAFE_NAME(name):
+            name = urllib.parse.quote(name)
+        return self._url_prefix + name
 
     @contextlib.contextmanager
     def request(self, method, url, chunk_name='', ignored_errors=(), timeout=(), **kwargs):
@@ -598,6 +889,18 @@ class S3ChunkStore(ChunkStore):
             else:
                 return result
 
+    def _decode_chunk(self, response, shape, dtype, out=None):
+        """Turn streamed HTTP response into chunk (the NPY decoder by default).
+
+        This is the extension point for alternative chunk encodings, e.g. a
+        compressed format selected by the response's Content-Type header. The
+        expected `shape` and `dtype` allow decoding into a preallocated array;
+        :meth:`get_chunk` checks the returned chunk against them. If `out` is
+        given, the chunk has to be stored in it (and `out` returned), or else
+        :exc:`chunkstore.BadChunk` raised if it doesn't fit.
+        """
+        return _read_chunk(response, out)
+
     def get_chunk(self, array_name, slices, dtype):
         """See the docstring of :meth:`ChunkStore.get_chunk`."""
         dtype = np.dtype(dtype)
@@ -606,13 +909,26 @@ class S3ChunkStore(ChunkStore):
         # Our hacky optimisation to speed up response reading doesn't
         # work with non-identity encodings.
         headers = {'Accept-Encoding': 'identity'}
-        chunk = self.complete_request('GET', url, chunk_name, _read_chunk,
+        decode = functools.partial(self._decode_chunk, shape=shape, dtype=dtype)
+        chunk = self.complete_request('GET', url, chunk_name, decode,
                                       headers=headers, stream=True)
         if chunk.shape != shape or chunk.dtype != dtype:
             raise BadChunk(f'Chunk {chunk_name!r}: dtype {chunk.dtype} and/or shape {chunk.shape} '
                            f'in store differs from expected dtype {dtype} and shape {shape}')
         return chunk
 
+    def get_chunk_into(self, array_name, slices, out):
+        """See the docstring of :meth:`ChunkStore.get_chunk_into`."""
+        chunk_name, shape = self.chunk_metadata(array_name, slices, chunk=out)
+        url = self._chunk_url(chunk_name)
+        headers = {'Accept-Encoding': 'identity'}
+        decode = functools.partial(self._decode_chunk, shape=shape, dtype=out.dtype, out=out)
+        try:
+            return self.complete_request('GET', url, chunk_name, decode,
+                                         headers=headers, stream=True)
+        except BadChunk as err:
+            raise BadChunk(f'Chunk {chunk_name!r}: {err}') from err
+
     def create_array(self, array_name):
         """See the docstring of :meth:`ChunkStore.create_array`."""
         # Array name is formatted as bucket/array but we only need to create bucket
@@ -639,7 +955,7 @@ class S3ChunkStore(ChunkStore):
 
         if self.expiry_days > 0:
             xml_payload = _BASE_LIFECYCLE_POLICY.format(self.expiry_days)
-            b64_md5 = base64.b64encode(hashlib.md5(xml_payload.encode('utf-8')).digest()).decode('utf-8')
+            b64_md5 = base64.b64encode(_md5(xml_payload.encode('utf-8')).digest()).decode('utf-8')
             lifecycle_headers = {'Content-Type': 'text/xml', 'Content-MD5': b64_md5}
             self.complete_request('PUT', url, params='lifecycle',
                                   data=xml_payload, headers=lifecycle_headers)
@@ -649,33 +965,142 @@ class S3ChunkStore(ChunkStore):
         chunk_name, _ = self.chunk_metadata(array_name, slices, chunk=chunk)
         url = self._chunk_url(chunk_name)
         npy_header, chunk = npy_header_and_body(chunk)
-        # Compute the MD5 sum to protect the object against corruption in
-        # transmission.
-        md5_gen = hashlib.md5(npy_header)
-        md5_gen.update(chunk)
-        md5 = base64.b64encode(md5_gen.digest())
-        headers = {'Content-MD5': md5.decode()}
         data = _Multipart([npy_header, memoryview(chunk)])
+        headers = {}
+        if self.checksum:
+            # Compute the checksum to protect the object against corruption in
+            # transmission, directly on the buffers making up the request body.
+            header, hash_factory = _CHECKSUMS[self.checksum]
+            headers[header] = base64.b64encode(data.digest(hash_factory)).decode()
         self.complete_request('PUT', url, chunk_name, headers=headers, data=data)
 
+    def get_chunks(self, array_name, slices_list, dtype, max_workers=None):
+        """Get multiple chunks of the same array from the store concurrently.
+
+        This overlaps the latencies of the individual HTTP requests, which
+        dominate the transfer time of small chunks. Each worker thread uses
+        its own session from the pool.
+
+        Parameters
+        ----------
+        array_name : string
+            Identifier of parent array `x` of chunks
+        slices_list : sequence of sequences of unit-stride slice objects
+            Identifiers of individual chunks, each extracted as `x[slices]`
+        dtype : :class:`numpy.dtype` object or equivalent
+            Data type of array `x`
+        max_workers : int, optional
+            Maximum number of concurrent requests (default depends on number
+            of chunks, up to a limit)
+
+        Returns
+        -------
+        chunks : list of :class:`numpy.ndarray`
+            Chunks in the same order as `slices_list`
+
+        Raises
+        ------
+        :exc:`chunkstore.ChunkStoreError`
+            The first error encountered by :meth:`get_chunk`
+        """
+        slices_list = list(slices_list)
+        if not slices_list:
+            return []
+        if max_workers is None:
+            max_workers = min(len(slices_list), _DEFAULT_MAX_WORKERS)
+        get = functools.partial(self.get_chunk, array_name, dtype=dtype)
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+            return list(executor.map(get, slices_list))
+
+    def put_chunks(self, array_name, slices_list, chunks, max_workers=None):
+        """Put multiple chunks of the same array into the store concurrently.
+
+        Parameters
+        ----------
+        array_name : string
+            Identifier of parent array `x` of chunks
+        slices_list : sequence of sequences of unit-stride slice objects
+            Identifiers of individual chunks, each extracted as `x[slices]`
+        chunks : sequence of :class:`numpy.ndarray` objects
+            Chunks as ndarrays with shapes commensurate with `slices_list`
+        max_workers : int, optional
+            Maximum number of concurrent requests (default depends on number
+            of chunks, up to a limit)
+
+        Raises
+        ------
+        :exc:`chunkstore.ChunkStoreError`
+            The first error encountered by :meth:`put_chunk`
+        """
+        slices_list = list(slices_list)
+        chunks = list(chunks)
+        if len(chunks) != len(slices_list):
+            raise BadChunk(f'Array {array_name!r}: got {len(chunks)} chunks '
+                           f'for {len(slices_list)} chunk IDs')
+        if not chunks:
+            return
+        if max_workers is None:
+            max_workers = min(len(chunks), _DEFAULT_MAX_WORKERS)
+        put = functools.partial(self.put_chunk, array_name)
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+            # Consume the results to raise the first error, if any
+            for _ in executor.map(put, slices_list, chunks):
+                pass
+
     def mark_complete(self, array_name):
         """See the docstring of :meth:`ChunkStore.mark_complete`."""
         self.create_array(array_name)
         obj_name = self.join(array_name, 'complete')
-        url = urllib.parse.urljoin(self._url, obj_name)
+        url = self._chunk_url(obj_name, extension='')
         self.complete_request('PUT', url, obj_name, data=b'')
 
     def is_complete(self, array_name):
         """See the docstring of :meth:`ChunkStore.is_complete`."""
         obj_name = self.join(array_name, 'complete')
-        url = urllib.parse.urljoin(self._url, obj_name)
+        url = self._chunk_url(obj_name, extension='')
         try:
             self.complete_request('GET', url, obj_name)
         except ChunkNotFound:
             return False
         return True
 
+    def list_chunk_ids(self, array_name):
+        """See the docstring of :meth:`ChunkStore.list_chunk_ids`."""
+        # Split off the bucket like create_array, as the store URL may already contain it
+        split_url = urllib.parse.urlsplit(self._chunk_url(array_name, extension=''))
+        bucket_name, _, path = split_url.path.lstrip('/').partition('/')
+        url = split_url._replace(path=bucket_name).geturl()
+        path = urllib.parse.unquote(path)
+        prefix = path + self.NAME_SEP if path else ''
+        # The delimiter excludes the chunks of any arrays nested inside this one
+        first_page = {'list-type': 2, 'prefix': prefix, 'delimiter': self.NAME_SEP,
+                      'max-keys': self.list_max_keys}
+
+        def parse(response):
+            # A missing bucket (404 is only ignored for the first page) has no chunks yet
+            if response.status_code == 404:
+                return [], None
+            return _parse_bucket_listing(response, prefix)
+
+        chunk_ids = []
+        params = first_page
+        while params is not None:
+            ignored_errors = (404,) if params is first_page else ()
+            page_chunk_ids, next_page = self.complete_request(
+                'GET', url, array_name, parse, ignored_errors=ignored_errors,
+                params=params, stream=True)
+            chunk_ids.extend(page_chunk_ids)
+            next_params = dict(first_page, **next_page) if next_page else None
+            if next_params == params:
+                # The server ignores our paging parameters and would keep sending the same page
+                raise StoreUnavailable(f'S3 server does not advance bucket listing of {array_name!r} '
+                                       f'beyond {next_page}')
+            params = next_params
+        return chunk_ids
+
     get_chunk.__doc__ = ChunkStore.get_chunk.__doc__
+    get_chunk_into.__doc__ = ChunkStore.get_chunk_into.__doc__
     put_chunk.__doc__ = ChunkStore.put_chunk.__doc__
     mark_complete.__doc__ = ChunkStore.mark_complete.__doc__
     is_complete.__doc__ = ChunkStore.is_complete.__doc__
+    list_chunk_ids.__doc__ = ChunkStore.list_chunk_ids.__doc__
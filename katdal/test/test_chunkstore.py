@@ -16,15 +16,17 @@
 
 """Tests for :py:mod:`katdal.chunkstore`."""
 
+import io
+
 import numpy as np
 from numpy.testing import assert_array_equal
 from nose.tools import (assert_raises, assert_equal, assert_true, assert_false,
-                        assert_is_instance, assert_is_none)
+                        assert_is_instance, assert_is_none, assert_is)
 import dask.array as da
 
 from katdal.chunkstore import (ChunkStore, generate_chunks,
                                StoreUnavailable, ChunkNotFound, BadChunk,
-                               PlaceholderChunk)
+                               PlaceholderChunk, npy_header_and_body)
 
 
 class TestGenerateChunks:
@@ -91,6 +93,17 @@ class TestGenerateChunks:
         assert_equal(chunks, ((10,), 1024 * (8,), (144,)))
 
 
+class TestNpyHeaderAndBody:
+    def test_roundtrip(self):
+        for array in [np.arange(20.).reshape(4, 5), np.arange(20).reshape(4, 5).T,
+                      np.array(2.), np.zeros(3, '>i4'), np.zeros(3, [('a', '<f4'), ('b', 'S3')])]:
+            # Do it twice to exercise the header cache too
+            for _ in range(2):
+                header, body = npy_header_and_body(array)
+                fp = io.BytesIO(header + body.tobytes())
+                np.testing.assert_array_equal(np.load(fp, allow_pickle=False), array)
+
+
 class TestChunkStore:
     """This tests the base class functionality."""
 
@@ -224,6 +237,19 @@ class ChunkStoreTestBase:
         # Try an empty slice on a zero-dimensional array (but why?)
         self.put_get_chunk('z', ())
 
+    def test_get_chunk_into(self):
+        name = self.array_name('y')
+        s = (slice(3, 7), slice(2, 5), slice(0, 2))
+        self.put_get_chunk('y', s)
+        out = np.empty_like(self.y[s])
+        assert_is(self.store.get_chunk_into(name, s, out), out)
+        assert_array_equal(out, self.y[s])
+        # Fill part of a bigger array (a non-contiguous view)
+        slab = np.zeros_like(self.y)
+        self.store.get_chunk_into(name, s, slab[s])
+        assert_array_equal(slab[s], self.y[s])
+        assert_raises(BadChunk, self.store.get_chunk_into, name, s, slab)
+
     def test_put_chunk_noraise(self):
         name = self.array_name('x')
         self.store.create_array(name)
@@ -323,5 +349,30 @@ class ChunkStoreTestBase:
             self.store.mark_complete(name)
             assert_true(self.store.is_complete(name))
 
+    def test_list_chunk_ids(self):
+        array_name, dask_array, _ = self.make_dask_array('big_y2')
+        self.put_dask_array('big_y2')
+        try:
+            chunk_ids = self.store.list_chunk_ids(array_name)
+        except NotImplementedError:
+            return
+        slices = da.core.slices_from_chunks(dask_array.chunks)
+        assert_equal(sorted(chunk_ids), sorted(self.store.chunk_id_str(s) for s in slices))
+        # An array that does not exist has no chunks
+        assert_equal(self.store.list_chunk_ids(self.array_name('no_such_array')), [])
+
+    def test_has_chunks(self):
+        array_name, dask_array, _ = self.make_dask_array('big_y2')
+        self.put_dask_array('big_y2')
+        slices_list = da.core.slices_from_chunks(dask_array.chunks)
+        missing = tuple(slice(s.stop, 2 * s.stop - s.start) for s in slices_list[-1])
+        try:
+            present = self.store.has_chunks(array_name, slices_list + [missing])
+        except NotImplementedError:
+            return
+        assert_equal(present, [True] * len(slices_list) + [False])
+        missing_array = self.array_name('no_such_array')
+        assert_equal(self.store.has_chunks(missing_array, slices_list), [False] * len(slices_list))
+
     def test_mark_complete_array(self):
         self._test_mark_complete(self.array_name('completetest'))
@@ -37,6 +37,7 @@ import http.server
 import urllib.parse
 import contextlib
 import io
+import hashlib
 import os
 import warnings
 import re
@@ -46,16 +47,16 @@ from urllib3.util.retry import Retry
 import numpy as np
 from numpy.testing import assert_array_equal
 from nose import SkipTest
-from nose.tools import assert_raises, assert_equal, timed
+from nose.tools import assert_raises, assert_equal, assert_is, assert_is_not, timed
 import requests
 import jwt
 import katsdptelstate
 from katsdptelstate.rdb_writer import RDBWriter
 
-from katdal.chunkstore_s3 import (S3ChunkStore, _AWSAuth, read_array,
-                                  decode_jwt, InvalidToken, TruncatedRead,
+from katdal.chunkstore_s3 import (S3ChunkStore, _AWSAuth, _Multipart, _Pool, _Crc32c, read_array,
+                                  decode_jwt, InvalidToken, TruncatedRead, S3ObjectNotFound, crc32c,
                                   _DEFAULT_SERVER_GLITCHES)
-from katdal.chunkstore import StoreUnavailable, ChunkNotFound
+from katdal.chunkstore import StoreUnavailable, ChunkNotFound, BadChunk, npy_header_and_body
 from katdal.test.test_chunkstore import ChunkStoreTestBase
 from katdal.test.s3_utils import S3User, S3Server, MissingProgram
 from katdal.datasources import TelstateDataSource
@@ -114,6 +115,10 @@ class TestReadArray:
     def testFortran(self):
         self._test(np.arange(20).reshape(4, 5, 1).T)
 
+    def testStructured(self):
+        # The header of a structured dtype is parsed by NumPy instead
+        self._test(np.zeros(3, [('a', '<f4'), ('b', 'S3')]))
+
     def testV2(self):
         # Make dtype that needs more than 64K to store, forcing .npy version 2.0
         dtype = np.dtype([('a' * 70000, np.float32), ('b', np.float32)])
@@ -122,6 +127,39 @@ class TestReadArray:
             warnings.simplefilter('ignore', category=UserWarning)
             self._test(np.zeros(100, dtype))
 
+    def testReadInto(self):
+        class RecordReadInto(io.BytesIO):
+            def readinto(self, buffer):
+                buffers.append(buffer)
+                return super().readinto(buffer)
+
+        buffers = []
+        array = np.arange(20).reshape(4, 5)
+        fp = RecordReadInto()
+        np.save(fp, array)
+        fp.seek(0)
+        out = read_array(fp)
+        np.testing.assert_equal(array, out)
+        # Check that the payload was read in one go straight into the output array
+        assert_equal(len(buffers), 1)
+        assert np.shares_memory(out, np.asarray(buffers[0]))
+
+    def testOut(self):
+        for array in [np.arange(20).reshape(4, 5), np.arange(20).reshape(4, 5).T]:
+            fp = io.BytesIO()
+            np.save(fp, array)
+            for out in [np.empty_like(array, order='C'), np.empty_like(array, order='F'),
+                        np.zeros([2 * n for n in array.shape], array.dtype)[::2, ::2]]:
+                fp.seek(0)
+                assert_is(read_array(fp, out), out)
+                np.testing.assert_equal(out, array)
+            fp.seek(0)
+            with assert_raises(BadChunk):
+                read_array(fp, np.empty(20, array.dtype))
+            fp.seek(0)
+            with assert_raises(BadChunk):
+                read_array(fp, np.empty(array.shape, np.float32))
+
     def testBadVersion(self):
         data = b'\x93NUMPY\x03\x04'     # Version 3.4
         fp = io.BytesIO(data)
@@ -148,6 +186,8 @@ class TestReadArray:
     def testShort(self):
         # Chop off everything past first byte (in magic part of bytes)
         self._truncate_and_fail_to_read(1)
+        # Chop off everything past byte 9 (in header length part of bytes)
+        self._truncate_and_fail_to_read(9)
         # Chop off everything past byte 20 (in header part of bytes)
         self._truncate_and_fail_to_read(20)
         # Chop off last byte (in array part of bytes)
@@ -202,6 +242,213 @@ class TestTokenUtils:
         assert_equal(payload, claims)
 
 
+class TestPool:
+    """Test the pool of sessions."""
+
+    def test_reuse(self):
+        created = []
+        pool = _Pool(lambda: created.append(object()) or created[-1])
+        with pool() as first:
+            with pool() as second:
+                assert_is_not(first, second)
+        # The most recently returned item is reused first
+        assert_is(pool.get(), first)
+        assert_is(pool.get(), second)
+        assert_equal(len(created), 2)
+        pool.get()
+        assert_equal(len(created), 3)
+
+
+class TestMultipart:
+    """Test the zero-copy request body used to upload chunks."""
+
+    def test_content_length(self):
+        header, chunk = npy_header_and_body(np.arange(20.).reshape(4, 5))
+        body = _Multipart([header, memoryview(chunk)])
+        request = requests.Request('PUT', 'http://127.0.0.1/', data=body).prepare()
+        # The body should be sent in one piece and not with chunked encoding
+        assert_equal(request.headers['Content-Length'], str(len(header) + chunk.nbytes))
+        assert 'Transfer-Encoding' not in request.headers
+        assert_equal(b''.join(request.body), header + chunk.tobytes())
+
+    def test_digest(self):
+        header, chunk = npy_header_and_body(np.arange(20.).reshape(4, 5))
+        body = _Multipart([header, memoryview(chunk)])
+        for hash_factory in [hashlib.md5, hashlib.sha256]:
+            assert_equal(body.digest(hash_factory),
+                         hash_factory(header + chunk.tobytes()).digest())
+
+
+class TestChunkUrl:
+    """Test the construction of chunk URLs (no server needed)."""
+
+    def test_chunk_url_is_relative_to_store_url(self):
+        chunk_name = 'bucket/array name/00001_00512'
+        for url in ['http://127.0.0.1:9000', 'http://127.0.0.1:9000/',
+                    'http://127.0.0.1:9000/bucket', 'http://127.0.0.1:9000/bucket/']:
+            store = S3ChunkStore(url)
+            expected = urllib.parse.urljoin(url, urllib.parse.quote(chunk_name + '.npy'))
+            assert_equal(store._chunk_url(chunk_name), expected)
+
+    def test_chunk_url_quoting(self):
+        store = S3ChunkStore('http://127.0.0.1:9000/')
+        for chunk_name in ['bucket/array/00001_00512', 'bucket/my-array.v2/00000',
+                           'bucket/array name/00001', 'bucket/array\n/00001',
+                           'bucket/ärray/00001', 'bucket/array?x=1#y/00001']:
+            expected = 'http://127.0.0.1:9000/' + urllib.parse.quote(chunk_name + '.npy')
+            assert_equal(store._chunk_url(chunk_name), expected)
+
+
+class _CannedListing:
+    """Stand-in for a streamed bucket listing response with the given XML body."""
+
+    def __init__(self, keys, truncated=False, extra='', status_code=200):
+        self.status_code = status_code
+        contents = ''.join(f'<Contents><Key>{key}</Key></Contents>' for key in keys)
+        body = ('<?xml version="1.0" encoding="UTF-8"?>'
+                '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+                f'<Name>bucket</Name><IsTruncated>{str(truncated).lower()}</IsTruncated>'
+                f'{extra}{contents}</ListBucketResult>')
+        self.raw = io.BytesIO(body.encode())
+
+
+class TestBucketListing:
+    """Test paging through bucket listings with canned responses (no server needed)."""
+
+    def setup(self):
+        self.store = S3ChunkStore('http://127.0.0.1:9000/')
+        self.urls = []
+        self.requests = []
+
+    def _serve(self, pages):
+        """Let the store fetch listings from `pages`, a function of the query parameters."""
+        @contextlib.contextmanager
+        def request(method, url, chunk_name='', ignored_errors=(), params=None, **kwargs):
+            self.urls.append(url)
+            self.requests.append(params)
+            response = pages(params)
+            # The real request maps both 403 and 404 to S3ObjectNotFound
+            if response.status_code >= 400 and response.status_code not in ignored_errors:
+                raise S3ObjectNotFound(f'HTTP error {response.status_code}')
+            yield response
+        self.store.request = request
+
+    def test_v1_server(self):
+        # A V1-only server ignores list-type=2 and its paging parameters
+        def pages(params):
+            if params.get('marker') is None:
+                return _CannedListing(['array/00000.npy', 'array/00001.npy'], truncated=True)
+            assert_equal(params['marker'], 'array/00001.npy')
+            return _CannedListing(['array/00002.npy', 'array/complete'])
+        self._serve(pages)
+        assert_equal(self.store.list_chunk_ids('bucket/array'), ['00000', '00001', '00002'])
+        assert_equal(len(self.requests), 2)
+
+    def test_v1_server_with_next_marker(self):
+        def pages(params):
+            if params.get('marker') is None:
+                return _CannedListing(['array/00000.npy'], truncated=True,
+                                      extra='<NextMarker>array/00000.npy</NextMarker>')
+            return _CannedListing(['array/00001.npy'])
+        self._serve(pages)
+        assert_equal(self.store.list_chunk_ids('bucket/array'), ['00000', '00001'])
+
+    def test_server_that_ignores_paging(self):
+        self._serve(lambda params: _CannedListing(['array/00000.npy'], truncated=True))
+        with assert_raises(StoreUnavailable):
+            self.store.list_chunk_ids('bucket/array')
+        assert_equal(len(self.requests), 2)
+
+    def test_missing_bucket(self):
+        self._serve(lambda params: _CannedListing([], status_code=404))
+        assert_equal(self.store.list_chunk_ids('bucket/array'), [])
+        assert_equal(self.store.has_chunks('bucket/array', [(slice(0, 1),)]), [False])
+
+    def test_forbidden_listing(self):
+        # Ceph RGW and AWS return 403 if the credentials lack list permission
+        self._serve(lambda params: _CannedListing([], status_code=403))
+        with assert_raises(S3ObjectNotFound):
+            self.store.list_chunk_ids('bucket/array')
+        with assert_raises(S3ObjectNotFound):
+            self.store.has_chunks('bucket/array', [(slice(0, 1),)])
+
+    def test_bucket_disappears_while_paging(self):
+        def pages(params):
+            if params.get('continuation-token') is None:
+                return _CannedListing(['array/00000.npy'], truncated=True,
+                                      extra='<NextContinuationToken>next</NextContinuationToken>')
+            return _CannedListing([], status_code=404)
+        self._serve(pages)
+        with assert_raises(S3ObjectNotFound):
+            self.store.list_chunk_ids('bucket/array')
+        assert_equal(len(self.requests), 2)
+
+    def test_bucket_relative_store(self):
+        # The store URL contains the bucket and part of the array name
+        self.store = S3ChunkStore('http://127.0.0.1:9000/bucket/array%20group/')
+        self._serve(lambda params: _CannedListing(['array group/array/00000.npy']))
+        assert_equal(self.store.list_chunk_ids('array'), ['00000'])
+        assert_equal(self.urls, ['http://127.0.0.1:9000/bucket'])
+        assert_equal(self.requests[0]['prefix'], 'array group/array/')
+
+    def test_truncated_listing_without_keys_or_token(self):
+        self._serve(lambda params: _CannedListing([], truncated=True))
+        with assert_raises(StoreUnavailable):
+            self.store.list_chunk_ids('bucket/array')
+        assert_equal(len(self.requests), 1)
+
+
+class TestChecksum:
+    """Test the checksums of uploaded chunks (no server needed)."""
+
+    def test_crc32c(self):
+        if not crc32c:
+            raise SkipTest('crc32c not installed')
+        crc = _Crc32c()
+        crc.update(b'1234')
+        crc.update(memoryview(b'56789'))
+        # Standard check value of CRC-32C
+        assert_equal(crc.digest(), bytes.fromhex('e3069283'))
+
+    def test_aws_signature_covers_checksum_header(self):
+        try:
+            import botocore.compat
+        except ImportError:
+            raise SkipTest('botocore not installed')
+        auth = _AWSAuth(('access', 'secret'))
+        # Fix the date to make the signature predictable
+        auth._signer._get_date = lambda: 'Thu, 01 Jan 2026 00:00:00 GMT'
+        request = requests.Request('PUT', 'http://127.0.0.1:9000/bucket/chunk.npy',
+                                   headers={'x-amz-checksum-sha256': 'abc'}).prepare()
+        auth(request)
+        assert_equal(request.headers['Date'], 'Thu, 01 Jan 2026 00:00:00 GMT')
+        string_to_sign = auth._signer.canonical_string(
+            'PUT', urllib.parse.urlsplit(request.url),
+            botocore.compat.HTTPHeaders.from_dict(dict(request.headers)))
+        assert 'x-amz-checksum-sha256:abc' in string_to_sign
+        signature = auth._signer.sign_string(string_to_sign)
+        assert_equal(request.headers['Authorization'], f'AWS access:{signature}')
+
+    def test_unknown_checksum(self):
+        with assert_raises(ValueError):
+            S3ChunkStore('http://127.0.0.1:9000/', checksum='md4')
+
+
+class TestSessionPool:
+    """Test the sharing of session pools between stores (no server needed)."""
+
+    def test_shared_between_equivalent_stores(self):
+        url = 'http://127.0.0.1:9000/'
+        store = S3ChunkStore(url, credentials=('access', 'secret'))
+        same = S3ChunkStore(url, credentials=['access', 'secret'])
+        assert_is(same._session_pool, store._session_pool)
+        for other in [S3ChunkStore(url), S3ChunkStore(url, retries=(2, 3)),
+                      S3ChunkStore('http://127.0.0.1:9001/', credentials=('access', 'secret')),
+                      S3ChunkStore(url, credentials=('access', 'other')),
+                      S3ChunkStore(url, retries=Retry(2), credentials=('access', 'secret'))]:
+            assert_is_not(other._session_pool, store._session_pool)
+
+
 class TestS3ChunkStore(ChunkStoreTestBase):
     """Test S3 functionality against an actual (minio) S3 service."""
 
@@ -302,6 +549,53 @@ class TestS3ChunkStore(ChunkStoreTestBase):
         with assert_raises(StoreUnavailable):
             S3ChunkStore('http://apparently.invalid/', token='secrettoken')
 
+    def test_get_put_chunks(self):
+        array_name = self.array_name('y')
+        slices_list = [np.index_exp[i:i + 2, 0:6, 0:2] for i in range(0, 8, 2)]
+        chunks = [self.y[slices] for slices in slices_list]
+        self.store.create_array(array_name)
+        self.store.put_chunks(array_name, slices_list, chunks)
+        chunks_retrieved = self.store.get_chunks(array_name, slices_list, self.y.dtype)
+        assert_equal(len(chunks_retrieved), len(chunks))
+        for chunk_retrieved, chunk in zip(chunks_retrieved, chunks):
+            assert_array_equal(chunk_retrieved, chunk)
+        assert_equal(self.store.get_chunks(array_name, [], self.y.dtype), [])
+        with assert_raises(ChunkNotFound):
+            self.store.get_chunks(array_name, slices_list + [np.index_exp[8:10, 0:6, 0:2]],
+                                  self.y.dtype)
+
+    def test_bucket_relative_store(self):
+        slices = np.index_exp[0:4, 0:6, 0:2]
+        missing = np.index_exp[4:8, 0:6, 0:2]
+        for name in ['y', 'y/nested']:
+            self.store.create_array(self.array_name(name))
+            self.store.put_chunk(self.array_name(name), slices, self.y[slices])
+        # The store URL already contains the bucket, so array names exclude it
+        store = S3ChunkStore(urllib.parse.urljoin(self.store_url, BUCKET + '/'), **self.store_kwargs)
+        assert_array_equal(store.get_chunk('y', slices, self.y.dtype), self.y[slices])
+        for name in ['y', 'y/nested']:
+            assert_equal(store.list_chunk_ids(name), [self.store.chunk_id_str(slices)])
+            assert_equal(store.has_chunks(name, [slices, missing]), [True, False])
+
+    def _test_put_with_checksum(self, checksum):
+        url, kwargs = self.prepare_store_args(self.s3_url, checksum=checksum)
+        store = S3ChunkStore(url, **kwargs)
+        array_name = self.array_name('y')
+        slices = np.index_exp[0:4, 0:6, 0:2]
+        store.create_array(array_name)
+        store.put_chunk(array_name, slices, self.y[slices])
+        assert_array_equal(self.store.get_chunk(array_name, slices, self.y.dtype),
+                           self.y[slices])
+
+    def test_put_with_checksum(self):
+        for checksum in ['sha256', None]:
+            self._test_put_with_checksum(checksum)
+
+    def test_put_with_crc32c(self):
+        if not crc32c:
+            raise SkipTest('crc32c not installed')
+        self._test_put_with_checksum('crc32c')
+
     def test_mark_complete_top_level(self):
         self._test_mark_complete(PREFIX + '-completetest')
 
@@ -56,10 +56,12 @@ setup(name='katdal',
       use_katversion=True,
       install_requires=['numpy >= 1.12.0', 'katpoint >= 0.9', 'h5py >= 2.3', 'numba',
                         'katsdptelstate[rdb] >= 0.10', 'dask[array] >= 1.2.1',
-                        'requests >= 2.18.0', 'pyjwt >= 2', 'cityhash >= 0.2.2'],
+                        'requests >= 2.18.0', 'pyjwt >= 2', 'cityhash >= 0.2.2',
+                        'defusedxml'],
       extras_require={
           'ms': ['python-casacore >= 2.2.1'],
           's3': [],
-          's3credentials': ['botocore']
+          's3credentials': ['botocore'],
+          's3crc32c': ['crc32c']
       },
       tests_require=['nose'])